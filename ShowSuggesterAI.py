@@ -7,26 +7,27 @@ Core module for the TV Show Recommender that handles:
 - Display of show images or AI-generated artwork (show_image)
 
 Dependencies:
-    - thefuzz: Fuzzy string matching for show name correction
+    - rapidfuzz: Fuzzy string matching for show name correction
     - pandas, numpy: Data handling and similarity computation
     - talking_to_AI: OpenAI integration for AI-generated show suggestions
-    - PIL, matplotlib: Image display
+    - requests, PIL, matplotlib: Image display (imported lazily by show_image, so
+      matching and recommendations don't pay their import cost)
 
 Data files required:
     - imdb_tvshows.csv: TV show catalog
     - imdb_tvshows_embedding.pkl: Pre-computed embeddings
-    - error-message.png: Fallback image when URLs fail
+    - error-message.png: Fallback image when images can't be loaded
 """
 
-from thefuzz import fuzz
+from rapidfuzz import fuzz, process
 import pandas as pd
 import numpy as np
-from embedding_file import load_embeddings
+from embedding_file import load_embedding_matrix
 from talking_to_AI import create_ai_tv
-import requests
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from io import BytesIO
-import matplotlib.pyplot as plt
+import base64
 import os
 import sys
 
@@ -39,38 +40,127 @@ def resource_path(relative_path: str) -> str:
     return os.path.join(base_path, relative_path)
 
 
+def cosine_similarity_prenorm(a_normed, b_normed) -> float:
+    """
+    Compute cosine similarity between two already L2-normalized vectors.
+
+    Args:
+        a_normed: unit-length np.ndarray (float32)
+        b_normed: unit-length np.ndarray of the same dtype
+
+    Returns:
+        Cosine similarity in [-1, 1] (the dot product of the two vectors).
+    """
+    return float(np.dot(a_normed, b_normed))
+
+
 def cosine_similarity(a, b) -> float:
     """
     Compute cosine similarity between two vectors.
 
+    Float ndarrays are used as-is (no copy, no upcast); anything else is
+    converted to a float32 array first, matching the embedding matrix.
+
     Args:
-        a: vector-like (list/np.ndarray)
-        b: vector-like (list/np.ndarray)
+        a: vector-like (list/np.ndarray, float32 preferred)
+        b: vector-like (list/np.ndarray, float32 preferred)
 
     Returns:
         Cosine similarity in [-1, 1]. Returns 0.0 if one vector is all zeros.
     """
-    a = np.asarray(a, dtype=float)
-    b = np.asarray(b, dtype=float)
+    if not isinstance(a, np.ndarray) or a.dtype.kind != 'f':
+        a = np.asarray(a, dtype=np.float32)
+    if not isinstance(b, np.ndarray) or b.dtype.kind != 'f':
+        b = np.asarray(b, dtype=np.float32)
 
     denom = np.linalg.norm(a) * np.linalg.norm(b)
     if denom == 0:
         return 0.0
-    return float(np.dot(a, b) / denom)
+    return cosine_similarity_prenorm(a, b) / float(denom)
+
+
+@lru_cache(maxsize=1)
+def _get_http_session():
+    """
+    Return a shared requests session for image downloads.
+    Keeps connections alive between requests and retries transient failures with backoff.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _load_image(image_url, session):
+    """
+    Fetch (or read) and open one image, falling back to the placeholder (error-message.png).
+
+    Args:
+        image_url: URL, data: URI, or local file path of the image.
+        session: requests session used for downloads.
+
+    Returns:
+        PIL image.
+
+    Raises:
+        FileNotFoundError: If the fetch fails and the placeholder image is missing.
+    """
+    from PIL import Image
+
+    try:
+        if image_url.startswith('data:'):
+            # Inline image, e.g. a poster talking_to_AI could not save to disk
+            _, _, payload = image_url.partition(';base64,')
+            image = Image.open(BytesIO(base64.b64decode(payload)))
+            image.load()
+            return image
+
+        if not image_url.startswith(('http://', 'https://')):
+            # Local file, e.g. a poster saved by talking_to_AI
+            image = Image.open(image_url)
+            image.load()
+            return image
+
+        with session.get(image_url, timeout=20, stream=True) as response:
+            response.raise_for_status()
+            # Decoding straight from the socket instead of buffering response.content first
+            response.raw.decode_content = True
+            image = Image.open(response.raw)
+            image.load()  # finish decoding before the connection goes back to the pool
+        return image
+    except Exception:
+        # Fallback placeholder image (make sure this file exists in your project)
+        holder_image = resource_path('error-message.png')
+        try:
+            return Image.open(holder_image)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"Fallback image '{holder_image}' not found. Add error-message.png to your project."
+            ) from None
 
 
 def show_image(df):
     """
     Display side-by-side images for the first two shows in the DataFrame.
 
-    Fetches images from URLs in the 'Image' column. On fetch failure, shows
-    a placeholder (error-message.png). Opens a matplotlib window.
+    Loads images from the URLs, data: URIs or local file paths in the 'Image' column
+    concurrently. On failure, shows a placeholder (error-message.png). Opens
+    a matplotlib window.
 
     Args:
-        df: DataFrame with an 'Image' column containing URLs.
+        df: DataFrame with an 'Image' column containing URLs, data: URIs or local paths.
 
     Returns:
-        List of the two image URLs that were displayed.
+        List of the two image URLs/paths that were displayed.
 
     Raises:
         ValueError: If 'Image' column is missing or DataFrame has fewer than 2 rows.
@@ -85,46 +175,69 @@ def show_image(df):
 
     image_urls = [df.iloc[0]['Image'], df.iloc[1]['Image']]
 
+    import matplotlib.pyplot as plt
+
+    # Fetching both images at the same time instead of one after the other
+    load_image = partial(_load_image, session=_get_http_session())
+    with ThreadPoolExecutor(max_workers=len(image_urls)) as executor:
+        images = list(executor.map(load_image, image_urls))
+
     # Setting the size of the figure
     plt.figure(figsize=(10, 5))
 
     # Display the images
-    for i, image_url in enumerate(image_urls):
+    for i, image in enumerate(images):
         ax = plt.subplot(1, 2, i + 1)
-
-        try:
-            response = requests.get(image_url, timeout=20)
-            response.raise_for_status()
-            image = Image.open(BytesIO(response.content))
-            ax.imshow(image)
-            ax.axis('off')
-        except Exception:
-            # Fallback placeholder image (make sure this file exists in your project)
-            holder_image = resource_path('error-message.png')
-            try:
-                image = Image.open(holder_image)
-            except FileNotFoundError:
-                raise FileNotFoundError(
-                    f"Fallback image '{holder_image}' not found. Add error-message.png to your project."
-                ) from None
-            ax.imshow(image)
-            ax.axis('off')
+        ax.imshow(image)
+        ax.axis('off')
 
     plt.tight_layout()
     plt.show()
     return image_urls
 
 
-def automatic_translator(shows_list, df):
+def preprocess_titles(df):
+    """
+    Normalize the catalog titles once for fuzzy matching.
+
+    Args:
+        df: DataFrame with a 'Title' column (catalog of known shows).
+
+    Returns:
+        Tuple of stripped, lowercased titles aligned with df['Title'].
+    """
+    return tuple(title.strip().lower() for title in df['Title'])
+
+
+@lru_cache(maxsize=1024)
+def _best_match(query, titles_proc):
+    """
+    Return the position of the catalog title closest to a normalized query.
+
+    Cached, so repeated names (e.g. across CLI retries) are matched only once.
+
+    Args:
+        query: Stripped, lowercased show name.
+        titles_proc: Output of preprocess_titles.
+
+    Returns:
+        Index into titles_proc of the best match.
+    """
+    return process.extractOne(query, titles_proc, scorer=fuzz.ratio)[2]
+
+
+def automatic_translator(shows_list, df, titles_proc=None):
     """
     Map user input (possibly misspelled) to correct show titles from the catalog.
 
-    Uses fuzzy string matching (thefuzz) to find the best match for each
-    user-entered show name against the DataFrame's Title column.
+    Uses case-insensitive fuzzy string matching (rapidfuzz) to find the best
+    match for each user-entered show name against the DataFrame's Title column.
 
     Args:
         shows_list: List of show names as entered by the user.
         df: DataFrame with a 'Title' column (catalog of known shows).
+        titles_proc: Optional output of preprocess_titles(df), to reuse across
+            repeated calls against the same catalog.
 
     Returns:
         List of corrected/matched show titles. Empty list if input is invalid.
@@ -132,15 +245,35 @@ def automatic_translator(shows_list, df):
     if not shows_list or df is None or not isinstance(df, pd.DataFrame):
         return []
 
-    correct_shows_list = []
-    for show in shows_list:
-        ratios = df['Title'].apply(lambda title, _show=show: fuzz.ratio(_show, title))
-        max_ratio_row = df.loc[ratios.idxmax()]
-        correct_shows_list.append(max_ratio_row['Title'])
+    if titles_proc is None:
+        titles_proc = preprocess_titles(df)
+
+    titles = df['Title'].tolist()
+    correct_shows_list = [titles[_best_match(show.strip().lower(), titles_proc)] for show in shows_list]
 
     return correct_shows_list
 
 
+def _top_k(scores, k):
+    """
+    Return the positions of the k highest scores, best first.
+
+    Uses an O(N) partial selection and only sorts the k winners; when there
+    are at most k scores, they are sorted directly.
+
+    Args:
+        scores: 1-D np.ndarray of scores.
+        k: Number of positions to return.
+
+    Returns:
+        np.ndarray of at most k positions into scores.
+    """
+    if len(scores) <= k:
+        return np.argsort(-scores, kind='stable')
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
 def ai_recommendation(shows_list, df):
     """
     Recommend TV shows based on input favorites using embedding similarity.
@@ -152,6 +285,8 @@ def ai_recommendation(shows_list, df):
     Args:
         shows_list: List of show titles the user likes (already matched by automatic_translator).
         df: DataFrame with 'Title' column (must match keys in embedding pickle).
+            The embeddings stay in the matrix from load_embedding_matrix; df is
+            only indexed to build the result and is never modified.
 
     Returns:
         Tuple of:
@@ -161,34 +296,29 @@ def ai_recommendation(shows_list, df):
     if not shows_list:
         return pd.DataFrame(), pd.DataFrame()
 
-    df = df.copy()
+    embed_matrix, embed_index = load_embedding_matrix(resource_path('imdb_tvshows_embedding.pkl'))
 
-    embed_dict_info = load_embeddings(resource_path('imdb_tvshows_embedding.pkl'))
-
-    df['Embedding'] = df['Title'].apply(lambda title: embed_dict_info.get(title))
-    df = df[df['Embedding'].notna()]
-
-    valid_embeds = [embed_dict_info[show] for show in shows_list if show in embed_dict_info]
-    if not valid_embeds:
+    input_rows = [embed_index[show] for show in shows_list if show in embed_index]
+    if not input_rows:
         return pd.DataFrame(), pd.DataFrame()
 
-    avg_embed = np.mean(valid_embeds, axis=0)
-
-    # Function that compute the similarity with the average embedding.
-    def computing_similarity(row):
-        return cosine_similarity(np.array(row), avg_embed)
+    # The rows of embed_matrix are already L2-normalized, so the similarity of every
+    # show is a single matrix-vector product with the normalized average embedding.
+    avg_embed = embed_matrix[input_rows].mean(axis=0)
+    avg_unit = avg_embed / (np.linalg.norm(avg_embed) or 1)
 
-    # Computing the similarity of each show's embedding with the average embedding.
-    df['Similarity'] = df['Embedding'].apply(computing_similarity)
+    # Positions (in df) of the shows that have an embedding and that the user did not give.
+    rows = df['Title'].map(embed_index)
+    candidates = (rows.notna() & ~df['Title'].isin(shows_list)).to_numpy().nonzero()[0]
 
-    # Creating a DataFrame that contains the shows from the file without the shows the user gave.
-    df_without_input_shows = df[~df['Title'].isin(shows_list)]
+    # Computing the similarity of each candidate's embedding with the average embedding.
+    sims = (embed_matrix @ avg_unit)[rows.to_numpy()[candidates].astype(np.intp)]
 
-    # Sorting the DataFrame based on similarity.
-    df_sort = df_without_input_shows.sort_values('Similarity', ascending=False)
+    # Picking the 5 most similar shows without sorting the whole catalog.
+    top = _top_k(sims, 5)
 
     # The recommended shows that we found in the file.
-    recommendation_shows = df_sort.head(5)
+    recommendation_shows = df.iloc[candidates[top]].assign(Similarity=sims[top])
 
     # The shows that the AI creates (optional)
     try:
@@ -204,6 +334,7 @@ def ai_recommendation(shows_list, df):
 if __name__ == '__main__':
     # Interactive CLI: prompts for favorite shows, shows recommendations and AI-generated content
     df = pd.read_csv(resource_path('imdb_tvshows.csv'))
+    titles_proc = preprocess_titles(df)
 
     while True:
         tv_shows = input(
@@ -218,7 +349,7 @@ if __name__ == '__main__':
             print("Please enter more than 1 show, separated by commas.\n")
             continue
 
-        correct_shows = automatic_translator(tv_shows, df)
+        correct_shows = automatic_translator(tv_shows, df, titles_proc)
         correction = input(f"Just to make sure, do you mean {correct_shows}? (y/n)\n").strip().lower()
 
         if correction != 'y':
@@ -245,7 +376,7 @@ if __name__ == '__main__':
             "\nHere are also the 2 TV show ads. Hope you like them!"
         )
 
-        # If your AI output DF contains 'Image' URLs, show them
+        # If your AI output DF contains 'Image' URLs/paths, show them
         try:
             show_image(generate_shows)
         except Exception as e:
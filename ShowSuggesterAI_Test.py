@@ -4,13 +4,19 @@ Test suite for ShowSuggesterAI module.
 Tests the core components of the TV Show Recommender:
 - automatic_translator: Fuzzy matching of user input to show titles
 - ai_recommendation: Recommendation logic with empty/valid inputs
+- cosine_similarity: Similarity helpers for single vector pairs
 - show_image: Image display handling with valid/invalid URLs
 
 Run with: pytest ShowSuggesterAI_Test.py -v
 """
 
-from ShowSuggesterAI import automatic_translator, ai_recommendation, show_image
+from ShowSuggesterAI import (automatic_translator, ai_recommendation, show_image, preprocess_titles,
+                             cosine_similarity, cosine_similarity_prenorm)
+from embedding_file import normalize_embeddings
+import base64
+import numpy as np
 import pandas as pd
+import pytest
 from unittest.mock import patch, MagicMock
 
 def test_automatic_translator():
@@ -35,11 +41,14 @@ def test_automatic_translator():
     assert automatic_translator(['Lopin', 'Rivedale', 'frid'], df) == ['Lupin', 'Riverdale', 'Friends']
     assert automatic_translator(['howi metyou', 'watcher', 'strange thing', 'brook 99'], df) == ['How I Met Your Mother', 'The Witcher', 'Stranger Things', 'Brooklyn Nine-Nine']
 
+    # Preprocessed titles can be reused across calls; matching ignores case
+    titles_proc = preprocess_titles(df)
+    assert automatic_translator(['GAME OF THRONS', ' lupin '], df, titles_proc) == ['Game Of Thrones', 'Lupin']
+
 def test_ai_recommendation():
     """Test recommendation logic with empty input and valid show lists."""
     df = pd.DataFrame({
-        'Title': ['How I Met Your Mother', 'The Witcher', 'Stranger Things'],
-        'Embedding': [[0.1, 0.2], [0.2, 0.3], [0.3, 0.4]]
+        'Title': ['How I Met Your Mother', 'The Witcher', 'Stranger Things']
     })
     # Empty input returns empty DataFrames
     shows_list = []
@@ -55,7 +64,7 @@ def test_ai_recommendation():
         'Stranger Things': [0.3, 0.4]
     }
 
-    with patch('ShowSuggesterAI.load_embeddings', return_value=embed_dict), \
+    with patch('ShowSuggesterAI.load_embedding_matrix', return_value=normalize_embeddings(embed_dict)), \
          patch('builtins.open', MagicMock()):
         recommend_shows, generate_shows = ai_recommendation(shows_list, df)
 
@@ -64,17 +73,56 @@ def test_ai_recommendation():
     assert not recommend_shows.empty, "Valid input should return recommendations"
     # Input shows are excluded; Stranger Things is the only remaining show
     assert 'Stranger Things' in recommend_shows['Title'].values
+    # Embeddings and similarities never touch the caller's catalog DataFrame
+    assert list(df.columns) == ['Title']
+
+def test_ai_recommendation_top5():
+    """Test that only the 5 most similar non-input shows are returned, best first."""
+    # Angles grow with the index, so similarity to the first show decreases with it
+    embed_dict = {f'Show {i}': [1.0, i / 10] for i in range(9)}
+    embed_dict['Zero'] = [0.0, 0.0]
+    df = pd.DataFrame({'Title': ['Zero', 'Unknown'] + [f'Show {i}' for i in reversed(range(9))]})
+
+    with patch('ShowSuggesterAI.load_embedding_matrix', return_value=normalize_embeddings(embed_dict)), \
+         patch('ShowSuggesterAI.create_ai_tv', return_value=pd.DataFrame()):
+        recommend_shows, _ = ai_recommendation(['Show 0', 'Show 2'], df)
+
+    assert recommend_shows['Title'].tolist() == ['Show 1', 'Show 3', 'Show 4', 'Show 5', 'Show 6']
+    assert recommend_shows['Similarity'].is_monotonic_decreasing
+
+def test_cosine_similarity():
+    """Test the single-pair similarity helpers: zero vectors, dtypes, and the pre-normalized path."""
+    # A zero vector has no direction: similarity is 0.0 instead of a division by zero
+    assert cosine_similarity([0.0, 0.0], [1.0, 2.0]) == 0.0
+    assert cosine_similarity([1.0, 2.0], [0.0, 0.0]) == 0.0
+
+    # Lists are converted to float32 and match the float64 result closely
+    assert cosine_similarity([1, 0], [1, 1]) == pytest.approx(1 / np.sqrt(2), rel=1e-6)
+
+    # float32 arrays are passed through as-is: no copy, no upcast to float64
+    a = np.array([0.6, 0.8], dtype=np.float32)
+    b = np.array([1.0, 0.0], dtype=np.float32)
+    with patch('ShowSuggesterAI.cosine_similarity_prenorm', wraps=cosine_similarity_prenorm) as prenorm:
+        cosine_similarity(a, b)
+    passed_a, passed_b = prenorm.call_args.args
+    assert passed_a is a and passed_b is b
+
+    # On unit vectors, the pre-normalized fast path equals the normalizing one
+    assert cosine_similarity_prenorm(a, b) == pytest.approx(cosine_similarity(a, b))
+    assert cosine_similarity_prenorm(a, a) == pytest.approx(1.0)
 
 def test_show_image():
     """Test show_image handles both invalid and valid image URLs."""
     expected_urls = ['url1', 'url2']
     df = pd.DataFrame({'Image': expected_urls})
     mock_ax = MagicMock()
-    with patch('ShowSuggesterAI.requests.get', side_effect=Exception("network")), \
-         patch('ShowSuggesterAI.plt.show'), \
-         patch('ShowSuggesterAI.Image.open', return_value=MagicMock()), \
-         patch('ShowSuggesterAI.plt.subplot', return_value=mock_ax), \
-         patch('ShowSuggesterAI.plt.figure'):
+    mock_session = MagicMock()
+    mock_session.get.side_effect = Exception("network")
+    with patch('ShowSuggesterAI._get_http_session', return_value=mock_session), \
+         patch('matplotlib.pyplot.show'), \
+         patch('PIL.Image.open', return_value=MagicMock()), \
+         patch('matplotlib.pyplot.subplot', return_value=mock_ax), \
+         patch('matplotlib.pyplot.figure'):
         result = show_image(df)
     assert result == expected_urls
     assert result == df['Image'].tolist()
@@ -83,18 +131,47 @@ def test_show_image():
     expected_urls = ['https://example.com/img1.jpg', 'https://example.com/img2.jpg']
     df = pd.DataFrame({'Image': expected_urls})
     mock_response = MagicMock()
-    mock_response.content = b'fake'
+    mock_response.__enter__.return_value = mock_response
     mock_response.raise_for_status = MagicMock()
     mock_ax = MagicMock()
-    with patch('ShowSuggesterAI.requests.get', return_value=mock_response), \
-         patch('ShowSuggesterAI.plt.show'), \
-         patch('ShowSuggesterAI.Image.open', return_value=MagicMock()), \
-         patch('ShowSuggesterAI.plt.subplot', return_value=mock_ax), \
-         patch('ShowSuggesterAI.plt.figure'):
+    mock_session = MagicMock()
+    mock_session.get.return_value = mock_response
+    with patch('ShowSuggesterAI._get_http_session', return_value=mock_session), \
+         patch('matplotlib.pyplot.show'), \
+         patch('PIL.Image.open', return_value=MagicMock()), \
+         patch('matplotlib.pyplot.subplot', return_value=mock_ax), \
+         patch('matplotlib.pyplot.figure'):
         result = show_image(df)
     assert result == expected_urls
     assert result == df['Image'].tolist()
 
+    # Local file paths (AI posters saved to disk) are opened directly, without the network
+    expected_paths = ['error-message.png', 'error-message.png']
+    df = pd.DataFrame({'Image': expected_paths})
+    mock_session = MagicMock()
+    mock_ax = MagicMock()
+    with patch('ShowSuggesterAI._get_http_session', return_value=mock_session), \
+         patch('matplotlib.pyplot.show'), \
+         patch('matplotlib.pyplot.subplot', return_value=mock_ax), \
+         patch('matplotlib.pyplot.figure'):
+        result = show_image(df)
+    assert result == expected_paths
+    mock_session.get.assert_not_called()
+    assert mock_ax.imshow.call_count == 2
 
-
-
+    # data: URIs (posters that could not be saved to disk) are decoded in memory
+    with open('error-message.png', 'rb') as f:
+        png_bytes = f.read()
+    expected_uris = ['data:image/png;base64,' + base64.b64encode(png_bytes).decode('ascii')] * 2
+    df = pd.DataFrame({'Image': expected_uris})
+    mock_session = MagicMock()
+    mock_ax = MagicMock()
+    with patch('ShowSuggesterAI._get_http_session', return_value=mock_session), \
+         patch('ShowSuggesterAI.resource_path', side_effect=AssertionError("placeholder used")), \
+         patch('matplotlib.pyplot.show'), \
+         patch('matplotlib.pyplot.subplot', return_value=mock_ax), \
+         patch('matplotlib.pyplot.figure'):
+        result = show_image(df)
+    assert result == expected_uris
+    mock_session.get.assert_not_called()
+    assert mock_ax.imshow.call_count == 2
@@ -0,0 +1,45 @@
+"""
+Atomic File Writes for TV Show Recommender.
+
+Shared by embedding_file (the .norm.npy/.titles.npy sidecars) and
+talking_to_AI (the on-disk response cache), which both write files that
+other processes may read at the same time.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+# mkstemp creates files readable by their owner only; written files get the usual umask-based mode instead
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_write(path: str, suffix: str = '.tmp'):
+    """
+    Open a temporary file next to path for binary writing, and move it into place on success.
+
+    Readers never see a partial file, and each writer gets its own temporary
+    file, so concurrent writers can't clobber each other. If the write fails,
+    the temporary file is removed and the error is raised.
+
+    Args:
+        path: File to create or replace. Missing parent directories are created.
+        suffix: Suffix of the temporary file (e.g. for .gitignore patterns).
+
+    Yields:
+        Binary file object to write the contents to.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        # Other processes (and accounts sharing this install) must be able to read it too
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -4,16 +4,46 @@ Embedding Loader for TV Show Recommender.
 Loads pre-computed text embeddings from imdb_tvshows_embedding.pkl for use in
 similarity-based recommendations. To regenerate embeddings, iterate over
 imdb_tvshows.csv and use OpenAI's text-embedding-ada-002 model.
+
+The embeddings are also exposed as a stacked, L2-normalized float32 matrix
+(load_embedding_matrix), persisted in sibling .norm.npy/.titles.npy files so
+later runs skip both the pickle deserialization and the normalization. The
+matrix file is memory-mapped read-only, so processes loading it share one
+copy through the OS page cache. The files are written on first use, or ahead
+of time with:
+
+    python embedding_file.py [imdb_tvshows_embedding.pkl]
 """
 
+import os
 import pickle
 from functools import lru_cache
 
+import numpy as np
+
+from atomic_file import atomic_write
+
 # --- Embedding generation code removed ---
 # To regenerate embeddings, iterate over imdb_tvshows.csv and for each row create
 # text = row["Genres"] + " - " + row["Description"], then call:
 #   openai.Embedding.create(input=text, model='text-embedding-ada-002')
 # and dump the {title: embedding} dict to imdb_tvshows_embedding.pkl.
+# The .norm.npy/.titles.npy sidecars are rebuilt automatically once the pickle is newer.
+
+
+def _sidecar_paths(path: str):
+    """
+    Return the (matrix, titles) sidecar paths for an embedding pickle.
+    """
+    return path + '.norm.npy', path + '.titles.npy'
+
+
+def _save_atomic(target: str, array: np.ndarray):
+    """
+    Save an array as .npy with atomic_write, so readers never see a partial file.
+    """
+    with atomic_write(target, suffix='.npy.tmp') as f:
+        np.save(f, array)
 
 
 @lru_cache(maxsize=4)
@@ -21,6 +51,8 @@ def load_embeddings(path: str = 'imdb_tvshows_embedding.pkl') -> dict:
     """
     Load pre-computed embeddings from a pickle file.
 
+    Results are cached per path; use load_embeddings.cache_clear() to force a reload.
+
     Args:
         path: Path to the pickle file (default: imdb_tvshows_embedding.pkl).
 
@@ -30,3 +62,90 @@ def load_embeddings(path: str = 'imdb_tvshows_embedding.pkl') -> dict:
     with open(path, 'rb') as f:
         # Trusted, project-internal artifact (Ruff S301)
         return pickle.load(f)
+
+
+def normalize_embeddings(embed_dict: dict):
+    """
+    Stack embeddings into a matrix with L2-normalized rows.
+
+    Args:
+        embed_dict: Dict mapping show titles to embedding vectors.
+
+    Returns:
+        Tuple of:
+        - matrix (np.ndarray): float32 array of shape (N, D), one unit-length row per show.
+        - index (dict): Mapping of show title to its row in the matrix.
+    """
+    titles = list(embed_dict)
+    matrix = np.asarray([embed_dict[title] for title in titles], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+    return matrix, {title: row for row, title in enumerate(titles)}
+
+
+def convert_embeddings(path: str = 'imdb_tvshows_embedding.pkl'):
+    """
+    Convert an embedding pickle into its normalized-matrix sidecars.
+
+    Args:
+        path: Path to the pickle file (default: imdb_tvshows_embedding.pkl).
+
+    Returns:
+        Tuple of (matrix, index) as returned by normalize_embeddings.
+
+    Raises:
+        OSError: If the sidecars cannot be written.
+    """
+    matrix, index = normalize_embeddings(load_embeddings(path))
+
+    # The matrix file is written last: its mtime marks the pair as up to date
+    matrix_path, titles_path = _sidecar_paths(path)
+    _save_atomic(titles_path, np.array(list(index)))
+    _save_atomic(matrix_path, matrix)
+    return matrix, index
+
+
+@lru_cache(maxsize=4)
+def load_embedding_matrix(path: str = 'imdb_tvshows_embedding.pkl'):
+    """
+    Load the pre-computed embeddings as a normalized matrix.
+
+    Memory-maps the sibling '<path>.norm.npy' file (titles from '<path>.titles.npy')
+    when it is at least as new as the pickle, without unpickling anything;
+    otherwise converts the pickle with convert_embeddings for the next run.
+    Results are cached per path and shared between callers, so the matrix is
+    always returned read-only (use load_embedding_matrix.cache_clear() to
+    force a reload).
+
+    Args:
+        path: Path to the pickle file (default: imdb_tvshows_embedding.pkl).
+
+    Returns:
+        Tuple of (matrix, index) as returned by normalize_embeddings.
+    """
+    matrix_path, titles_path = _sidecar_paths(path)
+    try:
+        if os.path.exists(matrix_path) and os.path.exists(titles_path) and (
+            not os.path.exists(path) or os.path.getmtime(matrix_path) >= os.path.getmtime(path)
+        ):
+            matrix = np.load(matrix_path, mmap_mode='r')
+            index = {title: row for row, title in enumerate(np.load(titles_path).tolist())}
+        else:
+            _, index = convert_embeddings(path)
+            # Serving the freshly written file too, so every process maps the same pages
+            matrix = np.load(matrix_path, mmap_mode='r')
+    except OSError:
+        # Sidecars not writable (e.g. a PyInstaller bundle) or not readable (another account's
+        # files): normalize the pickle in memory instead
+        matrix, index = normalize_embeddings(load_embeddings(path))
+
+    matrix.flags.writeable = False
+    return matrix, index
+
+
+if __name__ == '__main__':
+    # One-time conversion of the pickle into the .norm.npy/.titles.npy sidecars
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 'imdb_tvshows_embedding.pkl'
+    converted, _ = convert_embeddings(source)
+    print(f"Wrote {' and '.join(_sidecar_paths(source))} ({converted.shape[0]} shows x {converted.shape[1]} dims)")
@@ -0,0 +1,85 @@
+"""
+Test suite for embedding_file module.
+
+Tests the normalized-matrix sidecars of the embedding pickle:
+- convert_embeddings: Writes the .norm.npy/.titles.npy sidecars
+- load_embedding_matrix: Memory-maps the sidecars, rebuilding them when the pickle is newer
+
+Run with: pytest embedding_file_Test.py -v
+"""
+
+from embedding_file import convert_embeddings, load_embedding_matrix, load_embeddings, _sidecar_paths
+from unittest.mock import patch
+import os
+import pickle
+import stat
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def embedding_pickle(tmp_path):
+    """Write a small embedding pickle and clear the loader caches around the test."""
+    path = str(tmp_path / 'embeddings.pkl')
+    with open(path, 'wb') as f:
+        pickle.dump({'Lupin': [3.0, 4.0], 'Friends': [0.0, 2.0]}, f)
+    load_embeddings.cache_clear()
+    load_embedding_matrix.cache_clear()
+    yield path
+    load_embeddings.cache_clear()
+    load_embedding_matrix.cache_clear()
+
+def test_convert_embeddings(embedding_pickle):
+    """Test that the sidecars hold the normalized matrix and titles, with no temporary files left."""
+    matrix, index = convert_embeddings(embedding_pickle)
+    matrix_path, titles_path = _sidecar_paths(embedding_pickle)
+
+    assert index == {'Lupin': 0, 'Friends': 1}
+    np.testing.assert_allclose(np.load(matrix_path), [[0.6, 0.8], [0.0, 1.0]])
+    np.testing.assert_array_equal(np.load(matrix_path), matrix)
+    assert np.load(titles_path).tolist() == ['Lupin', 'Friends']
+    assert not [name for name in os.listdir(os.path.dirname(embedding_pickle)) if name.endswith('.tmp')]
+
+    # Sidecars follow the umask like any other file, so other accounts can map them too
+    umask = os.umask(0)
+    os.umask(umask)
+    for sidecar in (matrix_path, titles_path):
+        assert stat.S_IMODE(os.stat(sidecar).st_mode) == 0o666 & ~umask
+
+def test_load_embedding_matrix(embedding_pickle):
+    """Test that the matrix is served read-only from the sidecar, and rebuilt when the pickle changes."""
+    # First load writes the sidecars
+    load_embedding_matrix(embedding_pickle)
+    matrix_path, titles_path = _sidecar_paths(embedding_pickle)
+    assert os.path.exists(matrix_path) and os.path.exists(titles_path)
+
+    # Second load maps the sidecar without unpickling anything
+    load_embedding_matrix.cache_clear()
+    load_embeddings.cache_clear()
+    matrix, index = load_embedding_matrix(embedding_pickle)
+    assert isinstance(matrix, np.memmap)
+    assert not matrix.flags.writeable
+    assert load_embeddings.cache_info().currsize == 0
+    assert index == {'Lupin': 0, 'Friends': 1}
+    np.testing.assert_allclose(matrix, [[0.6, 0.8], [0.0, 1.0]])
+
+    # Unreadable sidecars fall back to normalizing the pickle in memory
+    load_embedding_matrix.cache_clear()
+    with patch('embedding_file.np.load', side_effect=PermissionError):
+        matrix, index = load_embedding_matrix(embedding_pickle)
+    assert not isinstance(matrix, np.memmap)
+    assert not matrix.flags.writeable
+    assert index == {'Lupin': 0, 'Friends': 1}
+    np.testing.assert_allclose(matrix, [[0.6, 0.8], [0.0, 1.0]])
+
+    # A pickle newer than the sidecar triggers a rebuild
+    with open(embedding_pickle, 'wb') as f:
+        pickle.dump({'Riverdale': [1.0, 0.0]}, f)
+    sidecar_mtime = os.path.getmtime(matrix_path)
+    os.utime(embedding_pickle, (sidecar_mtime + 10, sidecar_mtime + 10))
+    load_embedding_matrix.cache_clear()
+    load_embeddings.cache_clear()
+    matrix, index = load_embedding_matrix(embedding_pickle)
+    assert index == {'Riverdale': 0}
+    np.testing.assert_allclose(matrix, [[1.0, 0.0]])
+    np.testing.assert_allclose(np.load(matrix_path), [[1.0, 0.0]])
@@ -7,28 +7,64 @@ the results into a DataFrame for display.
 
 Dependencies:
     - openai: Chat completions (GPT) and image generation (DALL·E 2)
+    - httpx[http2]: Shared HTTP/2 keep-alive connection pool for the OpenAI client
     - dotenv: Load OPENAI_API_KEY from .env file
 
 Environment variables:
     OPENAI_API_KEY: Required for AI features
     OPENAI_ORGANIZATION, OPENAI_PROJECT: Optional, for org/project-scoped keys
+    OPENAI_CACHE_DIR: Optional, where responses are cached (default: .openai_cache)
+
+Identical requests are answered from an on-disk cache, so repeated runs with
+the same shows cost no API calls. Posters are stored there as PNG files.
 """
 
+import base64
+import hashlib
+import json
 import os
+import re
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from dotenv import load_dotenv
+import httpx
 import pandas as pd
 from openai import OpenAI
+from atomic_file import atomic_write
 
 # Load .env if present (works for both source and PyInstaller builds, as long as .env is next to the exe)
 load_dotenv()
 
+# The SDK retries rate limits (429), 5xx errors and dropped connections with
+# exponential backoff and jitter, honouring Retry-After; 5 retries = 6 attempts
+_MAX_RETRIES = 5
+
+# At most this many poster requests in flight at once, to stay under the rate limits
+_MAX_CONCURRENT_IMAGES = 4
+
+
+# Serializes the first _get_openai_client calls, so concurrent poster threads share one client
+_client_lock = threading.Lock()
+
 
-@lru_cache(maxsize=1)
 def _get_openai_client():
     """
     Return an OpenAI client (lazy, only when AI features are used).
-    This prevents the whole app from crashing at import time when no key exists.
+    This prevents the whole app from crashing at import time when no key exists,
+    and lets fully cached runs work without one.
+    All requests share one HTTP/2 connection pool, so TLS setup happens once per process.
+    """
+    with _client_lock:
+        return _create_openai_client()
+
+
+@lru_cache(maxsize=1)
+def _create_openai_client():
+    """
+    Build the shared OpenAI client; called through _get_openai_client.
     """
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
@@ -36,7 +72,16 @@ def _get_openai_client():
 
     org = os.getenv("OPENAI_ORGANIZATION")
     project = os.getenv("OPENAI_PROJECT")
-    kwargs = {"api_key": api_key}
+    kwargs = {
+        "api_key": api_key,
+        "max_retries": _MAX_RETRIES,
+        "http_client": httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+            timeout=60.0,
+            follow_redirects=True,
+        ),
+    }
     if org:
         kwargs["organization"] = org
     if project:
@@ -45,135 +90,317 @@ def _get_openai_client():
     return OpenAI(**kwargs)
 
 
+def _cache_path(endpoint: str, request: dict, suffix: str = ".json") -> str:
+    """
+    Return the cache file for a request: a hash of the endpoint and every request parameter.
+    """
+    key = json.dumps({"endpoint": endpoint, **request}, sort_keys=True)
+    digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    return os.path.abspath(os.path.join(os.getenv("OPENAI_CACHE_DIR") or ".openai_cache", digest + suffix))
+
+
+def _write_atomic(path: str, data: bytes):
+    """
+    Write a file with atomic_write, so readers never see a partial file and failed writes leave nothing behind.
+    """
+    with atomic_write(path) as f:
+        f.write(data)
+
+
+def _cache_get(endpoint: str, request: dict):
+    """
+    Return the cached result of a request, or None if it is missing or unreadable.
+    """
+    try:
+        with open(_cache_path(endpoint, request), encoding="utf-8") as f:
+            return json.load(f)["value"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _cache_put(endpoint: str, request: dict, value):
+    """
+    Store the result of a request. Caching is best effort: write errors are ignored.
+    """
+    entry = json.dumps({"value": value})
+    try:
+        _write_atomic(_cache_path(endpoint, request), entry.encode("utf-8"))
+    except OSError:
+        pass
+
+
 def extract_title_and_description(text: str):
     """
     Parse GPT output to extract TV series name and description.
 
-    Expects text in the format:
-        TV Series name: <name>
-        TV Series short description: <description>
+    Expects the JSON object requested through _SERIES_FORMAT:
+        {"name": "<name>", "description": "<description>"}
 
     Args:
         text: Raw string from GPT response.
 
     Returns:
-        Tuple of (title, description). Strips surrounding quotes.
+        Tuple of (title, description).
 
     Raises:
-        ValueError: If expected markers are not found in the output.
+        ValueError: If the output is not a JSON object with both fields.
     """
-    title_marker = "TV Series name: "
-    desc_marker = "TV Series short description: "
+    try:
+        series = json.loads(text)
+        return series["name"].strip(), series["description"].strip()
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError(
+            f"Expected a JSON object with 'name' and 'description' in GPT output:\n{text[:200]}"
+        ) from None
 
-    title_pos = text.find(title_marker)
-    if title_pos == -1:
-        raise ValueError(f"Expected '{title_marker}' not found in GPT output:\n{text[:200]}")
-    title_start = title_pos + len(title_marker)
-    title_end = text.find("\n", title_start)
-    if title_end == -1:
-        title_end = len(text)
-    title = text[title_start:title_end].strip().strip('"')
 
-    desc_pos = text.find(desc_marker)
-    if desc_pos == -1:
-        raise ValueError(f"Expected '{desc_marker}' not found in GPT output:\n{text[:200]}")
-    desc_start = desc_pos + len(desc_marker)
-    desc_end = text.find("\nTV Series name:", desc_start)  # next title (if exists)
-    description = text[desc_start:desc_end if desc_end != -1 else None].strip().strip('"')
+def _split_series(text: str):
+    """
+    Split the GPT output for both series into one JSON text per series.
 
-    return title, description
+    Args:
+        text: Raw string from GPT response, shaped by _SERIES_PAIR_FORMAT.
 
+    Returns:
+        Tuple of (text_a, text_b), each accepted by extract_title_and_description.
 
-def create_tv_series_names_and_descriptions(initial_shows, recommended_shows):
+    Raises:
+        ValueError: If the output is not a JSON object with series 'a' and 'b'.
     """
-    Use GPT to create two fictional TV series: one based on user favorites,
-    one based on the recommended shows.
+    try:
+        pair = json.loads(text)
+        return json.dumps(pair["a"]), json.dumps(pair["b"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Expected a JSON object with series 'a' and 'b' in GPT output:\n{text[:200]}") from None
 
-    Args:
-        initial_shows: List of show titles the user liked.
-        recommended_shows: DataFrame or list of recommended show titles.
 
-    Returns:
-        Tuple of (raw_text_initial, raw_text_recommended) from GPT.
+def _is_series_pair(text: str) -> bool:
+    """
+    Return whether text parses as the two-series answer, i.e. is safe to cache.
+    """
+    try:
+        _split_series(text)
+    except ValueError:
+        return False
+    return True
+
+
+# Built once at import; substitute() fills it in without re-parsing a format string
+_PROMPT_TEMPLATE = string.Template("""You are a creative TV Series Creator-Writer.
+Create TWO new TV series.
+Series A is based on this list of TV shows: $initial_shows
+Series B is based on this list of TV shows: $recommended_shows
+
+For each series, return its name and a one-sentence description.
+""")
+
+# Token budget for one {"name", "description"} object: a short title plus one
+# sentence is typically ~40 tokens, so this only cuts off runaway generations
+_SERIES_MAX_TOKENS = 120
+
+# Where series "a" starts in the streamed JSON output
+_SERIES_A_START = re.compile(r'\s*\{\s*"a"\s*:\s*')
+
+_SERIES_SCHEMA = {
+    "type": "object",
+    "properties": {"name": {"type": "string"}, "description": {"type": "string"}},
+    "required": ["name", "description"],
+    "additionalProperties": False,
+}
+
+# Structured output: the model must answer with exactly this JSON object
+_SERIES_PAIR_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "tv_series_pair",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"a": _SERIES_SCHEMA, "b": _SERIES_SCHEMA},
+            "required": ["a", "b"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _recommended_titles(recommended_shows):
     """
-    client = _get_openai_client()
+    Return the titles to send to the model for the recommended shows.
 
-    # recommended_shows can be a DataFrame; send only a small list to the model
-    recommended_titles = (
-        recommended_shows["Title"].head(5).tolist()
-        if isinstance(recommended_shows, pd.DataFrame) and "Title" in recommended_shows.columns
-        else recommended_shows
-    )
+    recommended_shows can be a DataFrame; only a small list is sent to the model.
+    """
+    if isinstance(recommended_shows, pd.DataFrame) and "Title" in recommended_shows.columns:
+        return recommended_shows["Title"].head(5).tolist()
+    return recommended_shows
 
-    prompt_template = """You are a creative TV Series Creator-Writer.
-Based on this list of TV shows: {shows}
-Create ONE new TV series.
 
-Return EXACTLY in this format (2 lines only):
-TV Series name: <name>
-TV Series short description: <description>
-"""
+def _chat_request(initial_shows, recommended_titles) -> dict:
+    """
+    Build the chat completion parameters for the two fictional TV series.
 
+    Shared by the live and the Batch API paths, so both hit the same cache entries.
+    """
+    prompt = _PROMPT_TEMPLATE.substitute(initial_shows=initial_shows, recommended_shows=recommended_titles)
     # For your project: gpt-4o-mini is a solid balance of quality + cost
-    response_chat_initial = client.chat.completions.create(
-        seed=1,
-        messages=[{"role": "user", "content": prompt_template.format(shows=initial_shows)}],
-        model="gpt-4o-mini",
-        temperature=0.8,
-        max_tokens=250,
-        timeout=60.0,
-    )
-    choice_initial = response_chat_initial.choices[0]
-    if choice_initial.message.content is None:
-        reason = getattr(choice_initial, "finish_reason", None)
+    return {
+        "seed": 1,
+        "messages": [{"role": "user", "content": prompt}],
+        "model": "gpt-4o-mini",
+        "temperature": 0.8,
+        "max_tokens": 2 * _SERIES_MAX_TOKENS,
+        "response_format": _SERIES_PAIR_FORMAT,
+    }
+
+
+def _complete_series_a(text: str):
+    """
+    Return the JSON text of series "a" once it is complete in a partial response, else None.
+    """
+    start = _SERIES_A_START.match(text)
+    if start is None:
+        return None
+    try:
+        series, _ = json.JSONDecoder().raw_decode(text, start.end())
+    except ValueError:
+        return None
+    return json.dumps(series)
+
+
+def _iter_series(request: dict, client=None):
+    """
+    Yield the JSON text of each series ("a", then "b") as soon as it is complete.
+
+    The response is streamed, so series "a" is available while GPT is still
+    writing series "b". Cached responses are yielded straight away, without
+    creating a client.
+
+    Args:
+        request: Chat completion parameters from _chat_request.
+        client: OpenAI client (default: the shared one from _get_openai_client).
+
+    Raises:
+        ValueError: If the model returned no content or not both series.
+    """
+    cached = _cache_get("chat.completions", request)
+    try:
+        cached_series = _split_series(cached) if cached is not None else None
+    except ValueError:
+        # An unparseable entry counts as a miss, and the fresh answer replaces it
+        cached_series = None
+    if cached_series is not None:
+        yield from cached_series
+        return
+
+    if client is None:
+        client = _get_openai_client()
+    parts, finish_reason, series_a = [], None, None
+    with client.chat.completions.create(**request, stream=True, timeout=60.0) as stream:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            if not choice.delta.content:
+                continue
+            parts.append(choice.delta.content)
+            # Series "a" can only have just completed if this piece closes an object
+            if series_a is None and "}" in choice.delta.content:
+                series_a = _complete_series_a("".join(parts))
+                if series_a is not None:
+                    yield series_a
+
+    text = "".join(parts)
+    if not text:
         raise ValueError(
-            f"Model returned no content (finish_reason={reason}). "
-            "Expected marker not found; possibly refused or content-filtered."
+            f"Model returned no content (finish_reason={finish_reason}). "
+            "Possibly refused or content-filtered."
         )
-    response_chat_text_initial = choice_initial.message.content
-
-    response_chat_recommended = client.chat.completions.create(
-        seed=1,
-        messages=[{"role": "user", "content": prompt_template.format(shows=recommended_titles)}],
-        model="gpt-4o-mini",
-        temperature=0.8,
-        max_tokens=250,
-        timeout=60.0,
+
+    series_texts = _split_series(text)
+    if finish_reason == "stop":
+        _cache_put("chat.completions", request, text)
+    if series_a is None:
+        yield series_texts[0]
+    yield series_texts[1]
+
+
+def create_tv_series_names_and_descriptions(initial_shows, recommended_shows):
+    """
+    Use GPT to create two fictional TV series: one based on user favorites,
+    one based on the recommended shows. Both come from a single request.
+
+    Args:
+        initial_shows: List of show titles the user liked.
+        recommended_shows: DataFrame or list of recommended show titles.
+
+    Returns:
+        Tuple of (raw_text_initial, raw_text_recommended), one JSON text per series.
+
+    Raises:
+        ValueError: If the model returned no content or not both series.
+    """
+    response_chat_text_initial, response_chat_text_recommended = _iter_series(
+        _chat_request(initial_shows, _recommended_titles(recommended_shows))
     )
-    choice_recommended = response_chat_recommended.choices[0]
-    if choice_recommended.message.content is None:
-        reason = getattr(choice_recommended, "finish_reason", None)
-        raise ValueError(
-            f"Model returned no content (finish_reason={reason}). "
-            "Expected marker not found; possibly refused or content-filtered."
-        )
-    response_chat_text_recommended = choice_recommended.message.content
 
     return response_chat_text_initial, response_chat_text_recommended
 
 
-def create_tv_series_photo(description: str):
+def create_tv_series_photo(description: str, client=None):
     """
     Generate a TV-series poster image from a description using DALL·E 2.
 
+    The image bytes come back in the response itself (no second download from
+    an expiring URL) and are kept as a PNG in the cache directory, which also
+    serves as the cache entry for identical requests.
+
     Args:
         description: Text description of the fictional TV series.
+        client: OpenAI client (default: the shared one from _get_openai_client).
 
     Returns:
-        URL string of the generated image (512x512).
+        Local path of the generated PNG image (512x512), or a data: URI
+        holding it when the cache directory is not writable.
     """
-    client = _get_openai_client()
-
     # DALL·E 2 is cheaper than DALL·E 3, good enough for a small poster in this project
-    response_image = client.images.generate(
-        model="dall-e-2",
-        prompt=f"Create a TV-series poster or wall art, based on this description: {description}",
-        n=1,
-        size="512x512",
-        timeout=60.0,
-    )
+    request = {
+        "model": "dall-e-2",
+        "prompt": f"Create a TV-series poster or wall art, based on this description: {description}",
+        "n": 1,
+        "size": "512x512",
+        "response_format": "b64_json",
+    }
+    image_path = _cache_path("images.generate", request, suffix=".png")
+    if os.path.exists(image_path):
+        return image_path
+
+    if client is None:
+        client = _get_openai_client()
+    response_image = client.images.generate(**request, timeout=60.0)
+    image_bytes = base64.b64decode(response_image.data[0].b64_json)
+
+    try:
+        _write_atomic(image_path, image_bytes)
+    except OSError:
+        # Cache directory not writable: hand the poster over inline, leaving no file behind
+        return "data:image/png;base64," + response_image.data[0].b64_json
+    return image_path
+
+
+def _add_posters(series):
+    """
+    Generate the posters for (title, description) pairs, all at the same time.
+    Identical descriptions share one poster (and one request).
 
-    return response_image.data[0].url
+    Returns:
+        List of (title, description, image_path) tuples.
+    """
+    descriptions = list(dict.fromkeys(description for _, description in series))
+    with ThreadPoolExecutor(max_workers=_MAX_CONCURRENT_IMAGES) as executor:
+        image_paths = dict(zip(descriptions, executor.map(create_tv_series_photo, descriptions)))
+
+    return [(title, description, image_paths[description]) for title, description in series]
 
 
 def create_ai_tv(initial_shows, recommended_shows):
@@ -181,30 +408,139 @@ def create_ai_tv(initial_shows, recommended_shows):
     Create two AI-generated fictional TV series with titles, descriptions, and poster images.
 
     Show #1 is based on the user's favorite shows; Show #2 is based on the
-    recommended shows. Each gets a DALL·E-generated poster image.
+    recommended shows. Both are written by a single streamed GPT request, and
+    each gets a DALL·E-generated poster image, requested as soon as its
+    description has arrived.
 
     Args:
         initial_shows: List of show titles the user liked.
         recommended_shows: DataFrame or list of recommended show titles.
 
     Returns:
-        DataFrame with columns: Title, Description, Image (URLs).
+        DataFrame with columns: Title, Description, Image (local PNG paths, or data: URIs).
+    """
+    request = _chat_request(initial_shows, _recommended_titles(recommended_shows))
+
+    # The client is only created on a cache miss, so fully cached runs need no API key
+    series, posters = [], []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for series_text in _iter_series(request):
+            title, description = extract_title_and_description(series_text)
+            series.append((title, description))
+            # Each poster starts as soon as its description is known, while GPT may still be writing the next one
+            posters.append(executor.submit(create_tv_series_photo, description))
+        image_paths = [poster.result() for poster in posters]
+
+    return _series_frame(
+        [(title, description, path) for (title, description), path in zip(series, image_paths)]
+    )
+
+
+def _series_frame(series):
+    """
+    Assemble (title, description, image_path) tuples into the create_ai_tv DataFrame.
+    The columns are built with an explicit string dtype, so pandas does not infer them.
+    """
+    titles, descriptions, image_paths = zip(*series)
+
+    return pd.DataFrame({
+        "Title": pd.array(titles, dtype="string"),
+        "Description": pd.array(descriptions, dtype="string"),
+        "Image": pd.array(image_paths, dtype="string"),
+    })
+
+
+def _run_chat_batch(client, chat_requests: dict, poll_interval: float) -> dict:
+    """
+    Run chat completions through the OpenAI Batch API and wait for the results.
+
+    Args:
+        client: OpenAI client.
+        chat_requests: Mapping of custom_id to chat completion parameters.
+        poll_interval: Seconds between batch status checks.
+
+    Returns:
+        Mapping of custom_id to the raw text of the GPT response.
+
+    Raises:
+        RuntimeError: If the batch fails, expires or is cancelled.
+        ValueError: If a request in the batch returned no content.
     """
-    response_from_initial_shows, response_from_recommended_shows = create_tv_series_names_and_descriptions(
-        initial_shows, recommended_shows
+    lines = "\n".join(
+        json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": request})
+        for custom_id, request in chat_requests.items()
+    )
+    batch_file = client.files.create(file=("tv_series_batch.jsonl", lines.encode("utf-8")), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h"
     )
 
-    titles, descriptions, image_urls = [], [], []
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+    texts = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        result = json.loads(line)
+        body = (result.get("response") or {}).get("body") or {}
+        choice = body["choices"][0] if body.get("choices") else {}
+        content = (choice.get("message") or {}).get("content")
+        if content is not None:
+            # Truncated or malformed answers are returned (and fail to parse) but never cached
+            if choice.get("finish_reason") == "stop" and _is_series_pair(content):
+                _cache_put("chat.completions", chat_requests[result["custom_id"]], content)
+            texts[result["custom_id"]] = content
+
+    # Requests that failed inside the batch only appear in its error file
+    missing = [custom_id for custom_id in chat_requests if custom_id not in texts]
+    if missing:
+        raise ValueError(f"Batch {batch.id} returned no content for: {', '.join(missing)}")
+    return texts
+
+
+def create_ai_tv_batch(users, poll_interval: float = 30.0):
+    """
+    Create AI-generated TV series for many users at once, for offline precomputation.
 
-    title_initial, description_initial = extract_title_and_description(response_from_initial_shows)
-    titles.append(title_initial)
-    descriptions.append(description_initial)
+    The chat requests go through the OpenAI Batch API (half the cost, separate
+    rate limits, but up to 24 hours to complete). Posters use regular image
+    requests, run concurrently once the descriptions are known. Cached
+    responses are reused and never resubmitted, and users with identical
+    requests share one batch entry.
 
-    title_recommended, description_recommended = extract_title_and_description(response_from_recommended_shows)
-    titles.append(title_recommended)
-    descriptions.append(description_recommended)
+    Args:
+        users: List of (initial_shows, recommended_shows) pairs, one per user.
+        poll_interval: Seconds between batch status checks.
 
-    image_urls.append(create_tv_series_photo(description_initial))
-    image_urls.append(create_tv_series_photo(description_recommended))
+    Returns:
+        List of DataFrames (one per user) as returned by create_ai_tv.
 
-    return pd.DataFrame({"Title": titles, "Description": descriptions, "Image": image_urls})
+    Raises:
+        RuntimeError: If the batch fails, expires or is cancelled.
+        ValueError: If a request in the batch returned no content.
+    """
+    chat_requests = [
+        _chat_request(initial_shows, _recommended_titles(recommended_shows))
+        for initial_shows, recommended_shows in users
+    ]
+
+    # Identical requests share a cache entry, so each distinct one is submitted (and billed) once
+    keys = [json.dumps(request, sort_keys=True) for request in chat_requests]
+    distinct = dict(zip(keys, chat_requests))
+    texts = {key: _cache_get("chat.completions", request) for key, request in distinct.items()}
+    pending = {f"request{i}": key for i, key in enumerate(distinct) if texts[key] is None}
+    if pending:
+        results = _run_chat_batch(
+            _get_openai_client(), {custom_id: distinct[key] for custom_id, key in pending.items()}, poll_interval
+        )
+        texts.update({key: results[custom_id] for custom_id, key in pending.items()})
+
+    series = [
+        extract_title_and_description(series_text)
+        for key in keys
+        for series_text in _split_series(texts[key])
+    ]
+    series = _add_posters(series)
+    return [_series_frame(series[i:i + 2]) for i in range(0, len(series), 2)]
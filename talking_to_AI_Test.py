@@ -0,0 +1,350 @@
+"""
+Test suite for talking_to_AI module.
+
+Tests the OpenAI integration without network access:
+- _cache_get/_cache_put: On-disk response cache
+- create_tv_series_photo: Poster caching, with and without a writable cache
+- _iter_series: Incremental parsing of the streamed chat response
+- create_ai_tv: Posters requested while the chat response is still streaming
+- create_ai_tv_batch: Batch API upload, polling, and result parsing
+- _get_openai_client: Created once, and only when a request misses the cache
+
+Run with: pytest talking_to_AI_Test.py -v
+"""
+
+from talking_to_AI import (_cache_get, _cache_path, _cache_put, _chat_request, _iter_series, create_ai_tv_batch,
+                          create_tv_series_photo, create_ai_tv, _get_openai_client, _create_openai_client)
+from atomic_file import atomic_write
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+import base64
+import errno
+import json
+import os
+import threading
+import pytest
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the response cache at a temporary directory."""
+    monkeypatch.setenv("OPENAI_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+def test_cache(cache_dir):
+    """Test cache round trips, misses on changed parameters, and corrupt entries."""
+    request = _chat_request(['Lupin'], ['Friends'])
+    assert _cache_get("chat.completions", request) is None
+
+    # Round trip, stored under the cache directory
+    _cache_put("chat.completions", request, '{"a": 1}')
+    assert _cache_get("chat.completions", request) == '{"a": 1}'
+    assert _cache_path("chat.completions", request).startswith(str(cache_dir))
+
+    # Any changed parameter (or endpoint) is a different entry
+    assert _cache_get("chat.completions", {**request, "temperature": 0.2}) is None
+    assert _cache_get("chat.completions", _chat_request(['Lupin'], ['Riverdale'])) is None
+    assert _cache_get("images.generate", request) is None
+
+    # A corrupt entry reads as a miss instead of raising
+    with open(_cache_path("chat.completions", request), "w", encoding="utf-8") as f:
+        f.write('{"value": "trunc')
+    assert _cache_get("chat.completions", request) is None
+
+def _image_client(png_bytes):
+    """Return a fake OpenAI client whose image generation answers with the given PNG bytes."""
+    client = MagicMock()
+    client.images.generate.return_value = SimpleNamespace(
+        data=[SimpleNamespace(b64_json=base64.b64encode(png_bytes).decode("ascii"))]
+    )
+    return client
+
+def test_create_tv_series_photo(cache_dir):
+    """Test that posters are saved and reused from the cache, or returned inline when it is not writable."""
+    client = _image_client(b"poster")
+    path = create_tv_series_photo("A thief.", client)
+    assert path.startswith(str(cache_dir)) and path.endswith(".png")
+    with open(path, "rb") as f:
+        assert f.read() == b"poster"
+    assert client.images.generate.call_args.kwargs["response_format"] == "b64_json"
+
+    # Cached: no second request
+    assert create_tv_series_photo("A thief.", client) == path
+    assert client.images.generate.call_count == 1
+
+    # Unwritable cache: the poster comes back inline as a data: URI, leaving no file behind
+    expected = "data:image/png;base64," + base64.b64encode(b"other poster").decode("ascii")
+    with patch('talking_to_AI.atomic_write', side_effect=PermissionError):
+        assert create_tv_series_photo("Six friends.", _image_client(b"other poster")) == expected
+
+    # Disk full halfway through the write: same, and the partial temporary file is removed
+    @contextmanager
+    def disk_full(path, suffix=".tmp"):
+        with atomic_write(path, suffix) as f:
+            def write(data):
+                f.write(data[:3])
+                raise OSError(errno.ENOSPC, "No space left on device")
+            yield SimpleNamespace(write=write)
+
+    files = sorted(os.listdir(cache_dir))
+    with patch('talking_to_AI.atomic_write', disk_full):
+        assert create_tv_series_photo("Six friends.", _image_client(b"other poster")) == expected
+    assert sorted(os.listdir(cache_dir)) == files
+
+class _FakeStream:
+    """A streamed chat response: yields one chunk per content piece and counts what was read."""
+
+    def __init__(self, pieces, finish_reason="stop"):
+        self.chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)])
+            for piece in pieces
+        ]
+        # The last chunk carries no content, only the finish reason (usage chunks have no choices)
+        self.chunks.append(SimpleNamespace(choices=[
+            SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason=finish_reason)
+        ]))
+        self.chunks.append(SimpleNamespace(choices=[]))
+        self.read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+def _stream_client(stream):
+    """Return a fake OpenAI client whose chat completions stream the given response."""
+    client = MagicMock()
+    client.chat.completions.create.return_value = stream
+    return client
+
+def test_iter_series_streaming(cache_dir):
+    """Test that series "a" is yielded while the rest is still streaming, and the full answer is cached."""
+    request = _chat_request(['Lupin'], ['Friends'])
+    # The "}" inside the name must not be taken for the end of series "a"
+    pieces = ['{"a": {"name": "Lupin', ' {Heist}', '", "description": "A thief."', '}', ', "b": {"name": "Frie',
+              'nds", "description": "Six friends."}}']
+    stream = _FakeStream(pieces)
+    client = _stream_client(stream)
+
+    series = _iter_series(request, client)
+    assert json.loads(next(series)) == {"name": "Lupin {Heist}", "description": "A thief."}
+    # Series "a" arrived as soon as its closing brace did, before the stream ended
+    assert stream.read == 4
+    assert json.loads(next(series)) == {"name": "Friends", "description": "Six friends."}
+    assert next(series, None) is None
+    assert client.chat.completions.create.call_args.kwargs["stream"] is True
+
+    # A complete answer is cached, and a cache hit makes no API call
+    assert _cache_get("chat.completions", request) == "".join(pieces)
+    client = _stream_client(_FakeStream([]))
+    assert [json.loads(text)["name"] for text in _iter_series(request, client)] == ["Lupin {Heist}", "Friends"]
+    client.chat.completions.create.assert_not_called()
+
+def test_create_ai_tv(cache_dir):
+    """Test that poster A is requested while series B is still streaming, and the rows form a typed frame."""
+    pieces = ['{"a": {"name": "Lupin', ' {Heist}', '", "description": "A thief."', '}', ', "b": {"name": "Frie',
+              'nds", "description": "Six friends."}}']
+    events = []
+    poster_requested = threading.Event()
+
+    class OrderedStream(_FakeStream):
+        """Records each chunk it hands out, and waits (briefly) for a poster request after series "a"."""
+
+        def __iter__(self):
+            for i, chunk in enumerate(super().__iter__()):
+                if i == 4:
+                    poster_requested.wait(timeout=5)
+                events.append(("chunk", i))
+                yield chunk
+
+    def generate(**request):
+        events.append(("poster", request["prompt"].rsplit(": ", 1)[1]))
+        poster_requested.set()
+        return _image_client(b"poster").images.generate.return_value
+
+    client = _stream_client(OrderedStream(pieces))
+    client.images.generate.side_effect = generate
+    with patch('talking_to_AI._get_openai_client', return_value=client):
+        frame = create_ai_tv(['Lupin'], ['Friends'])
+
+    # Poster A went out before the rest of the stream was read; poster B only once series "b" was complete
+    assert events.index(("poster", "A thief.")) < events.index(("chunk", 4))
+    assert events.index(("poster", "Six friends.")) > events.index(("chunk", 5))
+    assert client.images.generate.call_count == 2
+
+    assert list(frame.columns) == ["Title", "Description", "Image"]
+    assert all(dtype == "string" for dtype in frame.dtypes)
+    assert frame["Title"].tolist() == ["Lupin {Heist}", "Friends"]
+    assert frame["Description"].tolist() == ["A thief.", "Six friends."]
+    assert all(path.startswith(str(cache_dir)) and path.endswith(".png") for path in frame["Image"])
+
+def test_iter_series_errors(cache_dir):
+    """Test that truncated and empty responses raise ValueError and are never cached, and bad entries are misses."""
+    request = _chat_request(['Lupin'], ['Friends'])
+
+    # Cut off by max_tokens: series "a" still arrives, then the missing series "b" raises
+    stream = _FakeStream(['{"a": {"name": "Lupin", "description": "A thief."}', ', "b": {"name": "Fri'],
+                         finish_reason="length")
+    series = _iter_series(request, _stream_client(stream))
+    assert json.loads(next(series))["name"] == "Lupin"
+    with pytest.raises(ValueError):
+        next(series)
+    assert _cache_get("chat.completions", request) is None
+
+    # An unparseable cache entry counts as a miss and is replaced by the fresh answer
+    _cache_put("chat.completions", request, '{"a": {"name": "only one"}}')
+    pieces = ['{"a": {"name": "Lupin", "description": "A thief."}', ', "b": {"name": "Friends", "description": "Six."}}']
+    series = list(_iter_series(request, _stream_client(_FakeStream(pieces))))
+    assert [json.loads(text)["name"] for text in series] == ["Lupin", "Friends"]
+    assert _cache_get("chat.completions", request) == "".join(pieces)
+
+    # No content at all (e.g. refused or content-filtered)
+    request = _chat_request(['Riverdale'], ['Friends'])
+    stream = _FakeStream([], finish_reason="content_filter")
+    with pytest.raises(ValueError, match="no content"):
+        list(_iter_series(request, _stream_client(stream)))
+    assert _cache_get("chat.completions", request) is None
+
+def _pair(name):
+    """Return a GPT answer for the two series, named after one show."""
+    return json.dumps({
+        "a": {"name": f"{name} A", "description": f"Like {name}."},
+        "b": {"name": f"{name} B", "description": f"Unlike {name}."},
+    })
+
+def _batch_client(statuses, answer=_pair, skip=()):
+    """
+    Return a fake OpenAI client for the Batch API.
+
+    The batch goes through the given statuses (one per poll); its output answers
+    every uploaded request with answer(first initial show), except for the skipped ones.
+    """
+    client = MagicMock()
+    client.files.create.return_value = SimpleNamespace(id="file-in")
+    batches = [SimpleNamespace(id="batch-1", status=status, output_file_id="file-out") for status in statuses]
+    client.batches.create.return_value = batches[0]
+    client.batches.retrieve.side_effect = batches[1:]
+
+    def content(file_id):
+        uploaded = client.files.create.call_args.kwargs["file"][1].decode("utf-8").splitlines()
+        lines = []
+        # Output order is not guaranteed to follow the input
+        for line in reversed(uploaded):
+            entry = json.loads(line)
+            show = entry["body"]["messages"][0]["content"].split("TV shows: ['")[1].split("'")[0]
+            if show in skip:
+                continue
+            choice = {"message": {"content": answer(show)}, "finish_reason": "stop"}
+            lines.append(json.dumps({"custom_id": entry["custom_id"], "response": {"body": {"choices": [choice]}}}))
+        return SimpleNamespace(text="\n".join(lines))
+
+    client.files.content.side_effect = content
+    return client
+
+def _uploaded_requests(client):
+    """Return the request lines uploaded to a fake batch client."""
+    return [json.loads(line) for line in client.files.create.call_args.kwargs["file"][1].decode("utf-8").splitlines()]
+
+def test_create_ai_tv_batch(cache_dir):
+    """Test batch upload, polling, parsing by custom_id, deduplication, and cache reuse."""
+    users = [(['Lupin'], ['Friends']), (['Riverdale'], ['Friends']), (['Lupin'], ['Friends'])]
+    client = _batch_client(["validating", "in_progress", "completed"])
+    poster = MagicMock(side_effect=lambda description, client=None: f"{description}.png")
+    with patch('talking_to_AI._get_openai_client', return_value=client), \
+         patch('talking_to_AI.create_tv_series_photo', poster), \
+         patch('talking_to_AI.time.sleep'):
+        frames = create_ai_tv_batch(users, poll_interval=0)
+
+    # Identical users are uploaded once, as chat completion requests
+    uploaded = _uploaded_requests(client)
+    assert len(uploaded) == 2
+    assert {entry["custom_id"] for entry in uploaded} == {"request0", "request1"}
+    assert all(entry["url"] == "/v1/chat/completions" and entry["method"] == "POST" for entry in uploaded)
+    assert client.files.create.call_args.kwargs["purpose"] == "batch"
+    assert client.batches.retrieve.call_count == 2
+
+    # Results are matched back to each user by custom_id, not by output order
+    assert [frame["Title"].tolist() for frame in frames] == [
+        ["Lupin A", "Lupin B"], ["Riverdale A", "Riverdale B"], ["Lupin A", "Lupin B"]
+    ]
+    assert frames[1]["Image"].tolist() == ["Like Riverdale..png", "Unlike Riverdale..png"]
+    # Shared descriptions share a poster request
+    assert poster.call_count == 4
+
+    # Everything is cached now: a second run submits nothing
+    client = _batch_client(["completed"])
+    with patch('talking_to_AI._get_openai_client', return_value=client), \
+         patch('talking_to_AI.create_tv_series_photo', poster):
+        frames = create_ai_tv_batch(users[:2])
+    client.files.create.assert_not_called()
+    client.batches.create.assert_not_called()
+    assert frames[0]["Title"].tolist() == ["Lupin A", "Lupin B"]
+
+    # Only uncached requests are submitted
+    client = _batch_client(["completed"])
+    with patch('talking_to_AI._get_openai_client', return_value=client), \
+         patch('talking_to_AI.create_tv_series_photo', poster):
+        frames = create_ai_tv_batch([(['Lupin'], ['Friends']), (['Friends'], ['Lupin'])])
+    assert len(_uploaded_requests(client)) == 1
+    assert frames[1]["Title"].tolist() == ["Friends A", "Friends B"]
+
+def test_create_ai_tv_batch_errors(cache_dir):
+    """Test that failed batches and requests missing from the output raise, and nothing is cached."""
+    users = [(['Lupin'], ['Friends']), (['Riverdale'], ['Friends'])]
+
+    client = _batch_client(["in_progress", "failed"])
+    with patch('talking_to_AI._get_openai_client', return_value=client), \
+         patch('talking_to_AI.time.sleep'), \
+         pytest.raises(RuntimeError, match="failed"):
+        create_ai_tv_batch(users, poll_interval=0)
+    client.files.content.assert_not_called()
+
+    # A request that failed inside the batch is reported by its custom_id
+    client = _batch_client(["completed"], skip=("Riverdale",))
+    with patch('talking_to_AI._get_openai_client', return_value=client), \
+         pytest.raises(ValueError, match="request1"):
+        create_ai_tv_batch(users)
+    assert _cache_get("chat.completions", _chat_request(['Riverdale'], ['Friends'])) is None
+    # The answers that did come back are still cached
+    assert _cache_get("chat.completions", _chat_request(['Lupin'], ['Friends'])) == _pair("Lupin")
+
+    # A complete but malformed answer fails to parse and is never cached
+    client = _batch_client(["completed"], answer=lambda show: '{"a": {"name": "only one"}}')
+    with patch('talking_to_AI._get_openai_client', return_value=client), \
+         pytest.raises(ValueError):
+        create_ai_tv_batch([(['Riverdale'], ['Friends'])])
+    assert _cache_get("chat.completions", _chat_request(['Riverdale'], ['Friends'])) is None
+
+def test_cached_runs_need_no_client(cache_dir):
+    """Test that fully cached runs never create a client, so they work without an API key."""
+    users = [(['Lupin'], ['Friends'])]
+    client = _batch_client(["completed"])
+    client.images.generate.return_value = _image_client(b"poster").images.generate.return_value
+    with patch('talking_to_AI._get_openai_client', return_value=client):
+        expected = create_ai_tv_batch(users)[0]
+
+    missing_key = ValueError("Missing OPENAI_API_KEY")
+    with patch('talking_to_AI._get_openai_client', side_effect=missing_key):
+        assert create_ai_tv_batch(users)[0].equals(expected)
+        # The live path reads the same cache entries
+        assert create_ai_tv(['Lupin'], ['Friends']).equals(expected)
+
+def test_get_openai_client(monkeypatch):
+    """Test that concurrent first calls share one client."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    _create_openai_client.cache_clear()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: _get_openai_client(), range(8)))
+        assert all(client is clients[0] for client in clients)
+        assert clients[0].api_key == "test-key"
+    finally:
+        _create_openai_client.cache_clear()